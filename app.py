@@ -1,18 +1,35 @@
 """
 Main Flask application for Active Directory Clone.
 """
-from flask import Flask, render_template, redirect, url_for, flash, request, jsonify
+from flask import Flask, render_template, redirect, url_for, flash, request, jsonify, g, abort, Response, stream_with_context
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
-from urllib.parse import urlparse as url_parse
+from sqlalchemy import event, func, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import selectinload, raiseload, load_only
 
 from datetime import datetime
+from functools import lru_cache
+import csv
+import io
 import os
+import re
+import time
 
 from config import config
-from models import db, User, Group, OrganizationalUnit, Computer, AuditLog
+from models import db, audit_writer, upgrade_schema, search_user_ids, User, Group, OrganizationalUnit, Computer, AuditLog
 from forms import LoginForm, UserForm, PasswordResetForm, GroupForm, OrganizationalUnitForm, ComputerForm, AdminPasswordResetForm
 from auth import admin_required, login_required_with_message, get_client_ip
 
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    """Tune each new SQLite connection for concurrent reads and cheaper commits."""
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.execute('PRAGMA synchronous=NORMAL')
+    cursor.execute('PRAGMA temp_store=MEMORY')
+    cursor.execute('PRAGMA mmap_size=268435456')
+    cursor.execute('PRAGMA cache_size=-65536')
+    cursor.close()
+
 def create_app(config_name=None):
     """Application factory pattern."""
     app = Flask(__name__)
@@ -21,8 +38,20 @@ def create_app(config_name=None):
     config_name = config_name or os.environ.get('FLASK_CONFIG', 'default')
     app.config.from_object(config[config_name])
     
+    if app.config['SQLALCHEMY_DATABASE_URI'].startswith('sqlite'):
+        # Pooled SQLite connections are shared across worker threads
+        engine_options = dict(app.config['SQLALCHEMY_ENGINE_OPTIONS'])
+        engine_options['connect_args'] = dict(engine_options.get('connect_args', {}), check_same_thread=False)
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options
+    
     # Initialize extensions
     db.init_app(app)
+    audit_writer.init_app(app)
+    
+    with app.app_context():
+        if app.config['SQLITE_TUNING'] and app.config['SQLALCHEMY_DATABASE_URI'].startswith('sqlite'):
+            event.listen(db.engine, 'connect', _apply_sqlite_pragmas)
+        upgrade_schema()
     
     # Initialize Flask-Login
     login_manager = LoginManager()
@@ -35,23 +64,155 @@ def create_app(config_name=None):
     def load_user(user_id):
         return User.query.get(int(user_id))
     
+    @app.before_request
+    def store_client_ip():
+        # Resolved once here; audit logging reads it from g
+        g.client_ip = get_client_ip()
+    
     return app
 
 app = create_app()
 
+# Local paths only: a leading '//' would be a protocol-relative redirect off-site
+SAFE_NEXT_RE = re.compile(r'^/(?!/)[A-Za-z0-9_\-/?=&%.]*\Z')
+
+# Parameterless routes resolve to the same URL for a given script root
+_route_urls = {}
+
+def _route_url(endpoint):
+    """Memoized url_for() for routes that take no arguments."""
+    key = (endpoint, request.script_root)
+    url = _route_urls.get(key)
+    if url is None:
+        url = _route_urls[key] = url_for(endpoint)
+    return url
+
+def _per_page(default):
+    """Page size from ?per_page=, clamped to 1..MAX_ITEMS_PER_PAGE."""
+    per_page = request.args.get('per_page', default, type=int)
+    return max(1, min(per_page, app.config['MAX_ITEMS_PER_PAGE']))
+
+def _keyset_paginate(query, cursor_col, cursor_val, per_page, descending=False):
+    """Return one page of rows ordered by cursor_col, starting after cursor_val.
+
+    Returns (items, next_cursor); next_cursor is None on the last page.
+    """
+    if descending:
+        query = query.order_by(cursor_col.desc())
+        if cursor_val is not None:
+            query = query.filter(cursor_col < cursor_val)
+    else:
+        query = query.order_by(cursor_col)
+        if cursor_val is not None:
+            query = query.filter(cursor_col > cursor_val)
+    
+    rows = query.limit(per_page + 1).all()
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        next_cursor = getattr(rows[-1], cursor_col.key)
+    return rows, next_cursor
+
+@lru_cache(maxsize=1)
+def _dashboard_counts(time_bucket):
+    """Dashboard summary counts, recomputed once per DASHBOARD_STATS_TTL bucket."""
+    # One statement of scalar subqueries instead of six COUNT round trips
+    counts = {
+        'total_users': select(func.count(User.id)),
+        'active_users': select(func.count(User.id)).where(User.is_active.is_(True)),
+        'total_groups': select(func.count(Group.id)),
+        'total_computers': select(func.count(Computer.id)),
+        'computers_online': select(func.count(Computer.id)).where(Computer.status == 'ON'),
+        'total_ous': select(func.count(OrganizationalUnit.id))
+    }
+    row = db.session.execute(select(
+        *(count.scalar_subquery().label(name) for name, count in counts.items())
+    )).mappings().one()
+    return dict(row)
+
+def _get_or_404_only(model, id, *columns):
+    """Fetch a row by primary key loading only the given columns, or 404."""
+    obj = db.session.get(model, id, options=[load_only(*columns)])
+    if obj is None:
+        abort(404)
+    return obj
+
+# Column -> (form field, message) for the UNIQUE constraints each form can violate
+_USER_UNIQUE = {
+    'username': ('username', 'Username already exists. Please choose a different username.'),
+    'email': ('email', 'Email already registered. Please choose a different email.')
+}
+_GROUP_UNIQUE = {'name': ('name', 'Group name already exists. Please choose a different name.')}
+_OU_UNIQUE = {'name': ('name', 'OU name already exists. Please choose a different name.')}
+_COMPUTER_UNIQUE = {
+    'name': ('name', 'Computer name already exists. Please choose a different name.'),
+    'ip_address': ('ip_address', 'IP address already in use. Please choose a different IP address.')
+}
+
+def _flush_unique(form, model, unique_fields):
+    """Flush pending changes, reporting UNIQUE violations as form field errors.
+
+    The database enforces uniqueness, so there is no SELECT before the write
+    and no window for a concurrent duplicate. Returns False (after rolling
+    back) when a listed column collided; any other IntegrityError propagates.
+    """
+    try:
+        db.session.flush()
+        return True
+    except IntegrityError as e:
+        db.session.rollback()
+        detail = str(e.orig)
+        # NOT NULL, foreign key and CHECK failures name the same columns; only
+        # a UNIQUE violation means the value is taken
+        if not ('UNIQUE constraint failed' in detail or getattr(e.orig, 'pgcode', None) == '23505'):
+            raise
+        # SQLite reports 'table.column', PostgreSQL 'Key (column)=(...)'
+        table = model.__tablename__
+        collided = [
+            (field, message) for column, (field, message) in unique_fields.items()
+            if f'{table}.{column}' in detail or f'({column})' in detail
+        ]
+        if not collided:
+            raise
+        for field, message in collided:
+            form[field].errors.append(message)
+        return False
+
+def _get_admin_user():
+    """Return the built-in admin account, or None if there isn't one."""
+    return db.session.execute(
+        select(User).where(User.username == 'admin')
+    ).scalar_one_or_none()
+
+def _audit_log_search(search):
+    """Filter clause matching search in the action, target or details."""
+    return (
+        (AuditLog.action.contains(search)) |
+        (AuditLog.target.contains(search)) |
+        (AuditLog.details.contains(search))
+    )
+
+def _audit_log_query():
+    """AuditLog query with the acting user loaded in one batched SELECT."""
+    query = AuditLog.query.options(selectinload(AuditLog.user))
+    if app.config.get('RAISE_ON_LAZY_LOAD'):
+        # Surface any new per-row lazy load in templates as an error
+        query = query.options(raiseload('*'))
+    return query
+
 # Routes
 @app.route('/')
 def index():
     """Redirect to dashboard or login."""
     if current_user.is_authenticated:
-        return redirect(url_for('dashboard'))
-    return redirect(url_for('login'))
+        return redirect(_route_url('dashboard'))
+    return redirect(_route_url('login'))
 
 @app.route('/login', methods=['GET', 'POST'])
 def login():
     """Login page."""
     if current_user.is_authenticated:
-        return redirect(url_for('dashboard'))
+        return redirect(_route_url('dashboard'))
     
     form = LoginForm()
     if form.validate_on_submit():
@@ -59,22 +220,21 @@ def login():
         
         if user is None:
             flash('Invalid username or password', 'error')
-            return redirect(url_for('login'))
+            return redirect(_route_url('login'))
         
         # Check if account is locked
         if user.is_locked():
             flash('Account is locked due to too many failed login attempts. Please try again later.', 'error')
-            return redirect(url_for('login'))
+            return redirect(_route_url('login'))
         
         # Check if account is active
         if not user.is_active:
             flash('Account has been deactivated. Please contact an administrator.', 'error')
-            return redirect(url_for('login'))
+            return redirect(_route_url('login'))
         
         # Verify password
         if not user.check_password(form.password.data):
             user.increment_failed_attempts()
-            db.session.commit()
             flash('Invalid username or password', 'error')
             
             # Log failed login attempt
@@ -82,15 +242,15 @@ def login():
                 user_id=user.id,
                 action='Failed Login Attempt',
                 target=f'User: {user.username}',
-                details=f'Failed login from IP: {get_client_ip()}',
-                ip_address=get_client_ip()
+                details=f'Failed login from IP: {g.client_ip}',
+                ip_address=g.client_ip
             )
-            return redirect(url_for('login'))
+            db.session.commit()
+            return redirect(_route_url('login'))
         
         # Successful login
         user.failed_attempts = 0
         user.last_login = datetime.utcnow()
-        db.session.commit()
         
         login_user(user, remember=form.remember_me.data)
         
@@ -99,14 +259,15 @@ def login():
             user_id=user.id,
             action='User Login',
             target=f'User: {user.username}',
-            details=f'Successful login from IP: {get_client_ip()}',
-            ip_address=get_client_ip()
+            details=f'Successful login from IP: {g.client_ip}',
+            ip_address=g.client_ip
         )
+        db.session.commit()
         
         # Redirect to next page or dashboard
         next_page = request.args.get('next')
-        if not next_page or url_parse(next_page).netloc != '':
-            next_page = url_for('dashboard')
+        if not next_page or not SAFE_NEXT_RE.match(next_page):
+            next_page = _route_url('dashboard')
         return redirect(next_page)
     
     return render_template('login.html', title='Sign In', form=form)
@@ -115,33 +276,33 @@ def login():
 def admin_password_reset():
     """Admin password reset page accessible from login."""
     if current_user.is_authenticated:
-        return redirect(url_for('dashboard'))
+        return redirect(_route_url('dashboard'))
     
     form = AdminPasswordResetForm()
     if form.validate_on_submit():
         # Find the admin user
-        admin_user = User.query.filter_by(username='admin').first()
+        admin_user = _get_admin_user()
         
         if admin_user is None:
             flash('Admin user not found.', 'error')
-            return redirect(url_for('login'))
+            return redirect(_route_url('login'))
         
         # Update admin password
         admin_user.set_password(form.new_password.data)
         admin_user.unlock_account()  # Unlock account if it was locked
-        db.session.commit()
         
         # Log the password reset action
         AuditLog.log_action(
             user_id=admin_user.id,
             action='Admin Password Reset',
             target=f'User: {admin_user.username}',
-            details=f'Admin password reset from login page - IP: {get_client_ip()}',
-            ip_address=get_client_ip()
+            details=f'Admin password reset from login page - IP: {g.client_ip}',
+            ip_address=g.client_ip
         )
+        db.session.commit()
         
         flash('Admin password has been reset successfully. You can now log in with the new password.', 'success')
-        return redirect(url_for('login'))
+        return redirect(_route_url('login'))
     
     return render_template('admin_password_reset.html', title='Reset Admin Password', form=form)
 
@@ -154,28 +315,22 @@ def logout():
         user_id=current_user.id,
         action='User Logout',
         target=f'User: {current_user.username}',
-        details=f'User logged out from IP: {get_client_ip()}',
-        ip_address=get_client_ip()
+        details=f'User logged out from IP: {g.client_ip}',
+        ip_address=g.client_ip
     )
+    db.session.commit()
     
     logout_user()
     flash('You have been logged out successfully.', 'success')
-    return redirect(url_for('login'))
+    return redirect(_route_url('login'))
 
 @app.route('/dashboard')
 @login_required_with_message
 def dashboard():
     """Main dashboard."""
     # Get summary statistics
-    stats = {
-        'total_users': User.query.count(),
-        'active_users': User.query.filter_by(is_active=True).count(),
-        'total_groups': Group.query.count(),
-        'total_computers': Computer.query.count(),
-        'computers_online': Computer.query.filter_by(status='ON').count(),
-        'total_ous': OrganizationalUnit.query.count(),
-        'recent_logs': AuditLog.query.order_by(AuditLog.timestamp.desc()).limit(10).all()
-    }
+    stats = dict(_dashboard_counts(int(time.monotonic() // app.config['DASHBOARD_STATS_TTL'])))
+    stats['recent_logs'] = _audit_log_query().order_by(AuditLog.timestamp.desc(), AuditLog.id.desc()).limit(10).all()
     
     return render_template('dashboard.html', title='Dashboard', stats=stats)
 
@@ -183,24 +338,29 @@ def dashboard():
 @login_required_with_message
 def users():
     """User management page."""
-    page = request.args.get('page', 1, type=int)
+    after = request.args.get('after', None, type=str)
     search = request.args.get('search', '', type=str)
     
-    query = User.query
+    query = User.query.options(selectinload(User.groups))
     if search:
-        query = query.filter(
-            (User.username.contains(search)) |
-            (User.email.contains(search)) |
-            (User.first_name.contains(search)) |
-            (User.last_name.contains(search))
-        )
+        # One- and two-character prefixes match most of the FTS vocabulary, so
+        # short terms take the plain substring filter over the same four columns
+        if len(search) >= 3 and db.engine.dialect.name == 'sqlite' and search.split():
+            query = query.filter(User.id.in_(search_user_ids(search)))
+        else:
+            query = query.filter(
+                (User.username.contains(search)) |
+                (User.email.contains(search)) |
+                (User.first_name.contains(search)) |
+                (User.last_name.contains(search))
+            )
     
-    users_pagination = query.order_by(User.username).paginate(
-        page=page, per_page=app.config['ITEMS_PER_PAGE'], error_out=False
+    users_list, next_cursor = _keyset_paginate(
+        query, User.username, after, _per_page(app.config['ITEMS_PER_PAGE'])
     )
     
     return render_template('users.html', title='User Management', 
-                         users=users_pagination.items, pagination=users_pagination, search=search)
+                         users=users_list, after=after, next_cursor=next_cursor, search=search)
 
 @app.route('/users/add', methods=['GET', 'POST'])
 @admin_required
@@ -219,19 +379,20 @@ def add_user():
         user.set_password(form.password.data)
         
         db.session.add(user)
-        db.session.commit()
-        
-        # Log action
-        AuditLog.log_action(
-            user_id=current_user.id,
-            action='User Created',
-            target=f'User: {user.username}',
-            details=f'New user created with role: {user.role}',
-            ip_address=get_client_ip()
-        )
         
-        flash(f'User {user.username} has been created successfully.', 'success')
-        return redirect(url_for('users'))
+        if _flush_unique(form, User, _USER_UNIQUE):
+            # Log action
+            AuditLog.log_action(
+                user_id=current_user.id,
+                action='User Created',
+                target=f'User: {user.username}',
+                details=f'New user created with role: {user.role}',
+                ip_address=g.client_ip
+            )
+            db.session.commit()
+            
+            flash(f'User {user.username} has been created successfully.', 'success')
+            return redirect(_route_url('users'))
     
     return render_template('user_form.html', title='Add User', form=form, action='Add')
 
@@ -253,19 +414,19 @@ def edit_user(id):
         if form.password.data:
             user.set_password(form.password.data)
         
-        db.session.commit()
-        
-        # Log action
-        AuditLog.log_action(
-            user_id=current_user.id,
-            action='User Updated',
-            target=f'User: {user.username}',
-            details=f'User profile updated',
-            ip_address=get_client_ip()
-        )
-        
-        flash(f'User {user.username} has been updated successfully.', 'success')
-        return redirect(url_for('users'))
+        if _flush_unique(form, User, _USER_UNIQUE):
+            # Log action
+            AuditLog.log_action(
+                user_id=current_user.id,
+                action='User Updated',
+                target=f'User: {user.username}',
+                details=f'User profile updated',
+                ip_address=g.client_ip
+            )
+            db.session.commit()
+            
+            flash(f'User {user.username} has been updated successfully.', 'success')
+            return redirect(_route_url('users'))
     
     return render_template('user_form.html', title='Edit User', form=form, action='Edit', user=user)
 
@@ -273,15 +434,14 @@ def edit_user(id):
 @admin_required
 def delete_user(id):
     """Delete user."""
-    user = User.query.get_or_404(id)
+    user = _get_or_404_only(User, id, User.id, User.username)
     
     if user.id == current_user.id:
         flash('You cannot delete your own account.', 'error')
-        return redirect(url_for('users'))
+        return redirect(_route_url('users'))
     
     username = user.username
     db.session.delete(user)
-    db.session.commit()
     
     # Log action
     AuditLog.log_action(
@@ -289,11 +449,12 @@ def delete_user(id):
         action='User Deleted',
         target=f'User: {username}',
         details=f'User account deleted',
-        ip_address=get_client_ip()
+        ip_address=g.client_ip
     )
+    db.session.commit()
     
     flash(f'User {username} has been deleted successfully.', 'success')
-    return redirect(url_for('users'))
+    return redirect(_route_url('users'))
 
 @app.route('/users/reset-password/<int:id>', methods=['GET', 'POST'])
 @admin_required
@@ -305,7 +466,6 @@ def reset_password(id):
     if form.validate_on_submit():
         user.set_password(form.new_password.data)
         user.unlock_account()  # Unlock account if it was locked
-        db.session.commit()
         
         # Log action
         AuditLog.log_action(
@@ -313,11 +473,12 @@ def reset_password(id):
             action='Password Reset',
             target=f'User: {user.username}',
             details=f'Admin reset password for user',
-            ip_address=get_client_ip()
+            ip_address=g.client_ip
         )
+        db.session.commit()
         
         flash(f'Password has been reset for user {user.username}.', 'success')
-        return redirect(url_for('users'))
+        return redirect(_route_url('users'))
     
     return render_template('password_reset.html', title='Reset Password', form=form, user=user)
 
@@ -325,19 +486,19 @@ def reset_password(id):
 @login_required_with_message
 def groups():
     """Group management page."""
-    page = request.args.get('page', 1, type=int)
+    after = request.args.get('after', None, type=str)
     search = request.args.get('search', '', type=str)
     
-    query = Group.query
+    query = Group.query.options(selectinload(Group.members))
     if search:
         query = query.filter(Group.name.contains(search))
     
-    groups_pagination = query.order_by(Group.name).paginate(
-        page=page, per_page=app.config['ITEMS_PER_PAGE'], error_out=False
+    groups_list, next_cursor = _keyset_paginate(
+        query, Group.name, after, _per_page(app.config['ITEMS_PER_PAGE'])
     )
     
     return render_template('groups.html', title='Group Management',
-                         groups=groups_pagination.items, pagination=groups_pagination, search=search)
+                         groups=groups_list, after=after, next_cursor=next_cursor, search=search)
 
 @app.route('/groups/add', methods=['GET', 'POST'])
 @admin_required
@@ -352,19 +513,20 @@ def add_group():
         )
         
         db.session.add(group)
-        db.session.commit()
-        
-        # Log action
-        AuditLog.log_action(
-            user_id=current_user.id,
-            action='Group Created',
-            target=f'Group: {group.name}',
-            details=f'New group created with permissions: {group.permissions}',
-            ip_address=get_client_ip()
-        )
         
-        flash(f'Group {group.name} has been created successfully.', 'success')
-        return redirect(url_for('groups'))
+        if _flush_unique(form, Group, _GROUP_UNIQUE):
+            # Log action
+            AuditLog.log_action(
+                user_id=current_user.id,
+                action='Group Created',
+                target=f'Group: {group.name}',
+                details=f'New group created with permissions: {group.permissions}',
+                ip_address=g.client_ip
+            )
+            db.session.commit()
+            
+            flash(f'Group {group.name} has been created successfully.', 'success')
+            return redirect(_route_url('groups'))
     
     return render_template('group_form.html', title='Add Group', form=form, action='Add')
 
@@ -373,26 +535,26 @@ def add_group():
 def edit_group(id):
     """Edit existing group."""
     group = Group.query.get_or_404(id)
-    form = GroupForm(original_group=group, obj=group)
+    form = GroupForm(obj=group)
     
     if form.validate_on_submit():
         group.name = form.name.data
         group.description = form.description.data
         group.permissions = form.permissions.data
         
-        db.session.commit()
-        
-        # Log action
-        AuditLog.log_action(
-            user_id=current_user.id,
-            action='Group Updated',
-            target=f'Group: {group.name}',
-            details=f'Group information updated',
-            ip_address=get_client_ip()
-        )
-        
-        flash(f'Group {group.name} has been updated successfully.', 'success')
-        return redirect(url_for('groups'))
+        if _flush_unique(form, Group, _GROUP_UNIQUE):
+            # Log action
+            AuditLog.log_action(
+                user_id=current_user.id,
+                action='Group Updated',
+                target=f'Group: {group.name}',
+                details=f'Group information updated',
+                ip_address=g.client_ip
+            )
+            db.session.commit()
+            
+            flash(f'Group {group.name} has been updated successfully.', 'success')
+            return redirect(_route_url('groups'))
     
     return render_template('group_form.html', title='Edit Group', form=form, action='Edit', group=group)
 
@@ -400,11 +562,10 @@ def edit_group(id):
 @admin_required
 def delete_group(id):
     """Delete group."""
-    group = Group.query.get_or_404(id)
+    group = _get_or_404_only(Group, id, Group.id, Group.name)
     group_name = group.name
     
     db.session.delete(group)
-    db.session.commit()
     
     # Log action
     AuditLog.log_action(
@@ -412,29 +573,30 @@ def delete_group(id):
         action='Group Deleted',
         target=f'Group: {group_name}',
         details=f'Group deleted',
-        ip_address=get_client_ip()
+        ip_address=g.client_ip
     )
+    db.session.commit()
     
     flash(f'Group {group_name} has been deleted successfully.', 'success')
-    return redirect(url_for('groups'))
+    return redirect(_route_url('groups'))
 
 @app.route('/computers')
 @login_required_with_message
 def computers():
     """Computer management page."""
-    page = request.args.get('page', 1, type=int)
+    after = request.args.get('after', None, type=str)
     search = request.args.get('search', '', type=str)
     
-    query = Computer.query
+    query = Computer.query.options(selectinload(Computer.organizational_unit))
     if search:
         query = query.filter(Computer.name.contains(search))
     
-    computers_pagination = query.order_by(Computer.name).paginate(
-        page=page, per_page=app.config['ITEMS_PER_PAGE'], error_out=False
+    computers_list, next_cursor = _keyset_paginate(
+        query, Computer.name, after, _per_page(app.config['ITEMS_PER_PAGE'])
     )
     
     return render_template('computers.html', title='Computer Management',
-                         computers=computers_pagination.items, pagination=computers_pagination, search=search)
+                         computers=computers_list, after=after, next_cursor=next_cursor, search=search)
 
 @app.route('/computers/add', methods=['GET', 'POST'])
 @admin_required
@@ -452,19 +614,20 @@ def add_computer():
         )
         
         db.session.add(computer)
-        db.session.commit()
         
-        # Log action
-        AuditLog.log_action(
-            user_id=current_user.id,
-            action='Computer Created',
-            target=f'Computer: {computer.name}',
-            details=f'New computer added with status: {computer.status}',
-            ip_address=get_client_ip()
-        )
-        
-        flash(f'Computer {computer.name} has been created successfully.', 'success')
-        return redirect(url_for('computers'))
+        if _flush_unique(form, Computer, _COMPUTER_UNIQUE):
+            # Log action
+            AuditLog.log_action(
+                user_id=current_user.id,
+                action='Computer Created',
+                target=f'Computer: {computer.name}',
+                details=f'New computer added with status: {computer.status}',
+                ip_address=g.client_ip
+            )
+            db.session.commit()
+            
+            flash(f'Computer {computer.name} has been created successfully.', 'success')
+            return redirect(_route_url('computers'))
     
     return render_template('computer_form.html', title='Add Computer', form=form, action='Add')
 
@@ -473,7 +636,7 @@ def add_computer():
 def edit_computer(id):
     """Edit existing computer."""
     computer = Computer.query.get_or_404(id)
-    form = ComputerForm(original_computer=computer, obj=computer)
+    form = ComputerForm(obj=computer)
     
     if form.validate_on_submit():
         old_status = computer.status
@@ -484,23 +647,23 @@ def edit_computer(id):
         computer.status = form.status.data
         computer.ou_id = form.ou_id.data if form.ou_id.data != 0 else None
         
-        db.session.commit()
-        
-        # Log action
-        details = f'Computer information updated'
-        if old_status != computer.status:
-            details += f' - Status changed from {old_status} to {computer.status}'
-        
-        AuditLog.log_action(
-            user_id=current_user.id,
-            action='Computer Updated',
-            target=f'Computer: {computer.name}',
-            details=details,
-            ip_address=get_client_ip()
-        )
-        
-        flash(f'Computer {computer.name} has been updated successfully.', 'success')
-        return redirect(url_for('computers'))
+        if _flush_unique(form, Computer, _COMPUTER_UNIQUE):
+            # Log action
+            details = f'Computer information updated'
+            if old_status != computer.status:
+                details += f' - Status changed from {old_status} to {computer.status}'
+            
+            AuditLog.log_action(
+                user_id=current_user.id,
+                action='Computer Updated',
+                target=f'Computer: {computer.name}',
+                details=details,
+                ip_address=g.client_ip
+            )
+            db.session.commit()
+            
+            flash(f'Computer {computer.name} has been updated successfully.', 'success')
+            return redirect(_route_url('computers'))
     
     return render_template('computer_form.html', title='Edit Computer', form=form, action='Edit', computer=computer)
 
@@ -508,11 +671,10 @@ def edit_computer(id):
 @admin_required
 def delete_computer(id):
     """Delete computer."""
-    computer = Computer.query.get_or_404(id)
+    computer = _get_or_404_only(Computer, id, Computer.id, Computer.name)
     computer_name = computer.name
     
     db.session.delete(computer)
-    db.session.commit()
     
     # Log action
     AuditLog.log_action(
@@ -520,11 +682,12 @@ def delete_computer(id):
         action='Computer Deleted',
         target=f'Computer: {computer_name}',
         details=f'Computer removed from system',
-        ip_address=get_client_ip()
+        ip_address=g.client_ip
     )
+    db.session.commit()
     
     flash(f'Computer {computer_name} has been deleted successfully.', 'success')
-    return redirect(url_for('computers'))
+    return redirect(_route_url('computers'))
 
 @app.route('/computers/status/<int:id>/<status>', methods=['POST'])
 @admin_required
@@ -532,26 +695,25 @@ def change_computer_status(id, status):
     """Change computer status."""
     if status not in ['ON', 'OFF', 'RESTART']:
         flash('Invalid status.', 'error')
-        return redirect(url_for('computers'))
+        return redirect(_route_url('computers'))
     
     computer = Computer.query.get_or_404(id)
     old_status = computer.status
     computer.status = status
     computer.last_seen = datetime.utcnow() if status == 'ON' else None
     
-    db.session.commit()
-    
     # Log action
     AuditLog.log_action(
         user_id=current_user.id,
         action=f'Computer {status}',
         target=f'Computer: {computer.name}',
         details=f'Status changed from {old_status} to {status}',
-        ip_address=get_client_ip()
+        ip_address=g.client_ip
     )
+    db.session.commit()
     
     flash(f'Computer {computer.name} status changed to {status}.', 'success')
-    return redirect(url_for('computers'))
+    return redirect(_route_url('computers'))
 
 @app.route('/ous')
 @login_required_with_message
@@ -573,19 +735,20 @@ def add_ou():
         )
         
         db.session.add(ou)
-        db.session.commit()
-        
-        # Log action
-        AuditLog.log_action(
-            user_id=current_user.id,
-            action='OU Created',
-            target=f'OU: {ou.name}',
-            details=f'New organizational unit created',
-            ip_address=get_client_ip()
-        )
         
-        flash(f'Organizational Unit {ou.name} has been created successfully.', 'success')
-        return redirect(url_for('organizational_units'))
+        if _flush_unique(form, OrganizationalUnit, _OU_UNIQUE):
+            # Log action
+            AuditLog.log_action(
+                user_id=current_user.id,
+                action='OU Created',
+                target=f'OU: {ou.name}',
+                details=f'New organizational unit created',
+                ip_address=g.client_ip
+            )
+            db.session.commit()
+            
+            flash(f'Organizational Unit {ou.name} has been created successfully.', 'success')
+            return redirect(_route_url('organizational_units'))
     
     return render_template('ou_form.html', title='Add OU', form=form, action='Add')
 
@@ -601,19 +764,19 @@ def edit_ou(id):
         ou.description = form.description.data
         ou.parent_id = form.parent_id.data if form.parent_id.data != 0 else None
         
-        db.session.commit()
-        
-        # Log action
-        AuditLog.log_action(
-            user_id=current_user.id,
-            action='OU Updated',
-            target=f'OU: {ou.name}',
-            details=f'Organizational unit updated',
-            ip_address=get_client_ip()
-        )
-        
-        flash(f'Organizational Unit {ou.name} has been updated successfully.', 'success')
-        return redirect(url_for('organizational_units'))
+        if _flush_unique(form, OrganizationalUnit, _OU_UNIQUE):
+            # Log action
+            AuditLog.log_action(
+                user_id=current_user.id,
+                action='OU Updated',
+                target=f'OU: {ou.name}',
+                details=f'Organizational unit updated',
+                ip_address=g.client_ip
+            )
+            db.session.commit()
+            
+            flash(f'Organizational Unit {ou.name} has been updated successfully.', 'success')
+            return redirect(_route_url('organizational_units'))
     
     return render_template('ou_form.html', title='Edit OU', form=form, action='Edit', ou=ou)
 
@@ -621,11 +784,10 @@ def edit_ou(id):
 @admin_required
 def delete_ou(id):
     """Delete organizational unit."""
-    ou = OrganizationalUnit.query.get_or_404(id)
+    ou = _get_or_404_only(OrganizationalUnit, id, OrganizationalUnit.id, OrganizationalUnit.name)
     ou_name = ou.name
     
     db.session.delete(ou)
-    db.session.commit()
     
     # Log action
     AuditLog.log_action(
@@ -633,35 +795,64 @@ def delete_ou(id):
         action='OU Deleted',
         target=f'OU: {ou_name}',
         details=f'Organizational unit deleted',
-        ip_address=get_client_ip()
+        ip_address=g.client_ip
     )
+    db.session.commit()
     
     flash(f'Organizational Unit {ou_name} has been deleted successfully.', 'success')
-    return redirect(url_for('organizational_units'))
+    return redirect(_route_url('organizational_units'))
 
 @app.route('/logs')
 @login_required_with_message
 def audit_logs():
     """Audit logs page."""
-    page = request.args.get('page', 1, type=int)
+    after = request.args.get('after', None, type=int)
     search = request.args.get('search', '', type=str)
     
-    query = AuditLog.query
+    query = _audit_log_query()
     if search:
-        query = query.filter(
-            (AuditLog.action.contains(search)) |
-            (AuditLog.target.contains(search)) |
-            (AuditLog.details.contains(search))
-        )
+        query = query.filter(_audit_log_search(search))
     
-    logs_pagination = query.order_by(AuditLog.timestamp.desc()).paginate(
-        page=page, per_page=app.config['ITEMS_PER_PAGE'], error_out=False
+    # Newest first; the id descends with insertion order and is the PK index
+    logs_list, next_cursor = _keyset_paginate(
+        query, AuditLog.id, after, _per_page(app.config['LOG_ITEMS_PER_PAGE']), descending=True
     )
     
     return render_template('logs.html', title='Audit Logs',
-                         logs=logs_pagination.items, pagination=logs_pagination, search=search)
+                         logs=logs_list, after=after, next_cursor=next_cursor, search=search)
+
+@app.route('/logs/export.csv')
+@admin_required
+def export_audit_logs():
+    """Stream audit logs as CSV without materializing the whole table."""
+    search = request.args.get('search', '', type=str)
+    
+    statement = (
+        select(AuditLog.timestamp, User.username, AuditLog.action, AuditLog.target,
+               AuditLog.details, AuditLog.ip_address)
+        .outerjoin(User, AuditLog.user_id == User.id)
+        .order_by(AuditLog.id.desc())
+        .execution_options(stream_results=True, yield_per=1000)
+    )
+    if search:
+        statement = statement.where(_audit_log_search(search))
+    
+    def generate():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(['Timestamp', 'User', 'Action', 'Target', 'Details', 'IP Address'])
+        for partition in db.session.execute(statement).partitions():
+            writer.writerows(partition)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        yield buffer.getvalue()
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/csv',
+        headers={'Content-Disposition': 'attachment; filename=audit_logs.csv'}
+    )
 
 if __name__ == '__main__':
-    with app.app_context():
-        db.create_all()  # ✅ correct
-    app.run(debug=True, port=5001)
+    app.run(debug=True, port=5001)
\ No newline at end of file
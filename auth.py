@@ -37,7 +37,8 @@ def login_required_with_message(f):
 
 def get_client_ip():
     """Get client IP address for audit logging."""
-    if request.environ.get('HTTP_X_FORWARDED_FOR') is None:
-        return request.environ['REMOTE_ADDR']
-    else:
-        return request.environ['HTTP_X_FORWARDED_FOR']
\ No newline at end of file
+    forwarded_for = request.environ.get('HTTP_X_FORWARDED_FOR')
+    if forwarded_for is None:
+        return request.environ.get('REMOTE_ADDR')
+    # The header may carry a proxy chain; the leftmost entry is the client
+    return forwarded_for.split(',', 1)[0].strip()
\ No newline at end of file
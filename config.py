@@ -13,6 +13,12 @@ class Config:
     # Database settings
     SQLALCHEMY_DATABASE_URI = 'sqlite:///ad_clone.db'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SQLITE_TUNING = True  # WAL journal and related pragmas on SQLite connections
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_size': 10,
+        'pool_pre_ping': True,
+        'pool_recycle': 1800
+    }
     
     # Flask-Login settings
     REMEMBER_COOKIE_DURATION = timedelta(days=7)
@@ -20,15 +26,27 @@ class Config:
     
     # Password policy settings
     MIN_PASSWORD_LENGTH = 8
+    # Werkzeug hash method for new passwords; existing hashes verify with their own method
+    PASSWORD_HASH_METHOD = 'scrypt'
     MAX_FAILED_ATTEMPTS = 3
     ACCOUNT_LOCKOUT_DURATION = timedelta(minutes=15)
     
     # Application settings
     ITEMS_PER_PAGE = 20
+    LOG_ITEMS_PER_PAGE = 50
+    MAX_ITEMS_PER_PAGE = 100  # upper bound for ?per_page=
+    RAISE_ON_LAZY_LOAD = False
+    DASHBOARD_STATS_TTL = 10  # seconds
+    
+    # Audit log settings
+    AUDIT_LOG_ASYNC = True
+    AUDIT_LOG_BATCH_SIZE = 512
+    AUDIT_LOG_FLUSH_INTERVAL = 0.1  # seconds
     
 class DevelopmentConfig(Config):
     """Development configuration."""
     DEBUG = True
+    RAISE_ON_LAZY_LOAD = True
     
 class ProductionConfig(Config):
     """Production configuration."""
@@ -1,19 +1,47 @@
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from sqlalchemy import insert
+from werkzeug.security import generate_password_hash
+
 from app import app, db
 from models import User
 
-with app.app_context():
-    if not User.query.filter_by(username='admin').first():
-        admin = User(
-            username='admin',
-            email='admin@example.com',
-            first_name='Admin',       # <- yaha value add karo
-            last_name='User',         # <- yaha value add karo
-            role='Admin',
-            is_active=True
-        )
-        admin.set_password('Admin@123')
-        db.session.add(admin)
-        db.session.commit()
-        print("Admin user created successfully!")
-    else:
-        print("Admin user already exists.")
+def seed_users(rows):
+    """Insert many users in one statement and one commit.
+
+    Each row is a dict of User columns plus a plain-text 'password'. The
+    password hashes are computed in a thread pool, since hashlib releases
+    the GIL while stretching.
+    """
+    rows = [dict(row) for row in rows]
+    passwords = [row.pop('password') for row in rows]
+    for password in passwords:
+        if not User.validate_password_strength(password):
+            raise ValueError("Password does not meet security requirements")
+
+    hash_password = partial(generate_password_hash, method=app.config['PASSWORD_HASH_METHOD'])
+    with ThreadPoolExecutor() as pool:
+        hashes = list(pool.map(hash_password, passwords))
+    for row, password_hash in zip(rows, hashes):
+        row['password_hash'] = password_hash
+
+    if rows:
+        db.session.execute(insert(User), rows)
+    db.session.commit()
+
+if __name__ == '__main__':
+    with app.app_context():
+        if not User.query.filter_by(username='admin').first():
+            seed_users([{
+                'username': 'admin',
+                'email': 'admin@example.com',
+                'first_name': 'Admin',       # <- yaha value add karo
+                'last_name': 'User',         # <- yaha value add karo
+                'role': 'Admin',
+                'is_active': True,
+                'password': 'Admin@123'
+            }])
+            print("Admin user created successfully!")
+        else:
+            print("Admin user already exists.")
@@ -1,10 +1,30 @@
 """
 Forms for the Active Directory Clone application.
 """
+from flask import g
 from flask_wtf import FlaskForm
 from wtforms import StringField, PasswordField, BooleanField, SubmitField, SelectField, TextAreaField
-from wtforms.validators import DataRequired, Email, EqualTo, Length, ValidationError, Regexp
-from models import User, Group, OrganizationalUnit, Computer
+from wtforms.validators import DataRequired, Email, EqualTo, Length, Optional, ValidationError
+from models import User, OrganizationalUnit
+
+def _strong_pw(form, field):
+    """Password policy check; the rules live in User.password_policy_error."""
+    error = User.password_policy_error(field.data or '')
+    if error:
+        raise ValidationError(error)
+
+# Shared by every password field; validators are stateless, so one list per policy is enough
+_PW_VALIDATORS = [Optional(), _strong_pw]
+_PW_VALIDATORS_REQ = [DataRequired(), _strong_pw]
+
+def _cached_ous():
+    """OUs for dropdown choices, queried at most once per request."""
+    if not hasattr(g, '_ous'):
+        # Plain (id, name) rows; the dropdowns never need full OU objects
+        g._ous = OrganizationalUnit.query.with_entities(
+            OrganizationalUnit.id, OrganizationalUnit.name
+        ).order_by(OrganizationalUnit.name).all()
+    return g._ous
 
 class LoginForm(FlaskForm):
     """User login form."""
@@ -15,12 +35,7 @@ class LoginForm(FlaskForm):
 
 class AdminPasswordResetForm(FlaskForm):
     """Admin password reset form for login page."""
-    new_password = PasswordField('New Password', validators=[
-        DataRequired(),
-        Length(min=8, message='Password must be at least 8 characters long.'),
-        Regexp(r'(?=.*[A-Z])', message='Password must contain at least one uppercase letter.'),
-        Regexp(r'(?=.*\d)', message='Password must contain at least one number.')
-    ])
+    new_password = PasswordField('New Password', validators=_PW_VALIDATORS_REQ)
     confirm_password = PasswordField('Confirm New Password', validators=[
         DataRequired(),
         EqualTo('new_password', message='Passwords must match.')
@@ -33,10 +48,9 @@ class UserForm(FlaskForm):
     email = StringField('Email', validators=[DataRequired(), Email()])
     first_name = StringField('First Name', validators=[DataRequired(), Length(max=50)])
     last_name = StringField('Last Name', validators=[DataRequired(), Length(max=50)])
-    password = PasswordField('Password', validators=[
-        Length(min=8, message='Password must be at least 8 characters long.'),
-        Regexp(r'(?=.*[A-Z])', message='Password must contain at least one uppercase letter.'),
-        Regexp(r'(?=.*\d)', message='Password must contain at least one number.')
+    password = PasswordField('Password', validators=_PW_VALIDATORS)
+    confirm_password = PasswordField('Confirm Password', validators=[
+        EqualTo('password', message='Passwords must match')
     ])
     role = SelectField('Role', choices=[('User', 'User'), ('Admin', 'Admin')], validators=[DataRequired()])
     is_active = BooleanField('Active Account', default=True)
@@ -47,47 +61,11 @@ class UserForm(FlaskForm):
         self.original_user = original_user
         
         # Make password optional for editing existing users
-        if original_user:
-            self.password.validators = [
-                Length(min=8, message='Password must be at least 8 characters long.'),
-                Regexp(r'(?=.*[A-Z])', message='Password must contain at least one uppercase letter.'),
-                Regexp(r'(?=.*\d)', message='Password must contain at least one number.')
-            ]
-        else:
-            self.password.validators.insert(0, DataRequired())
-    
-    def validate_username(self, username):
-        if self.original_user is None or username.data != self.original_user.username:
-            user = User.query.filter_by(username=username.data).first()
-            if user is not None:
-                raise ValidationError('Username already exists. Please choose a different username.')
-    
-    def validate_email(self, email):
-        if self.original_user is None or email.data != self.original_user.email:
-            user = User.query.filter_by(email=email.data).first()
-            if user is not None:
-                raise ValidationError('Email already registered. Please choose a different email.')
+        self.password.validators = _PW_VALIDATORS if original_user else _PW_VALIDATORS_REQ
 
-class UserForm(FlaskForm):
-    username = StringField('Username', validators=[DataRequired()])
-    email = StringField('Email', validators=[DataRequired(), Email()])
-    first_name = StringField('First Name', validators=[DataRequired()])
-    last_name = StringField('Last Name', validators=[DataRequired()])
-    password = PasswordField('Password', validators=[DataRequired()])
-    confirm_password = PasswordField('Confirm Password', validators=[
-        EqualTo('password', message='Passwords must match')
-    ])
-    role = SelectField('Role', choices=[('admin', 'Admin'), ('user', 'User')], validators=[DataRequired()])
-    is_active = BooleanField('Active', default=True)
-    submit = SubmitField('Submit')
 class PasswordResetForm(FlaskForm):
     """Password reset form for admin use."""
-    new_password = PasswordField('New Password', validators=[
-        DataRequired(),
-        Length(min=8, message='Password must be at least 8 characters long.'),
-        Regexp(r'(?=.*[A-Z])', message='Password must contain at least one uppercase letter.'),
-        Regexp(r'(?=.*\d)', message='Password must contain at least one number.')
-    ])
+    new_password = PasswordField('New Password', validators=_PW_VALIDATORS_REQ)
     confirm_password = PasswordField('Confirm New Password', validators=[
         DataRequired(),
         EqualTo('new_password', message='Passwords must match.')
@@ -102,16 +80,6 @@ class GroupForm(FlaskForm):
                             choices=[('read-only', 'Read Only'), ('read-write', 'Read Write')], 
                             validators=[DataRequired()])
     submit = SubmitField('Save Group')
-    
-    def __init__(self, original_group=None, *args, **kwargs):
-        super(GroupForm, self).__init__(*args, **kwargs)
-        self.original_group = original_group
-    
-    def validate_name(self, name):
-        if self.original_group is None or name.data != self.original_group.name:
-            group = Group.query.filter_by(name=name.data).first()
-            if group is not None:
-                raise ValidationError('Group name already exists. Please choose a different name.')
 
 class OrganizationalUnitForm(FlaskForm):
     """Organizational Unit creation and editing form."""
@@ -125,21 +93,13 @@ class OrganizationalUnitForm(FlaskForm):
         self.original_ou = original_ou
         
         # Populate parent OU choices
-        ous = OrganizationalUnit.query.all()
+        ous = _cached_ous()
         choices = [(0, 'None (Root Level)')]
         
-        for ou in ous:
-            # Don't allow selecting self as parent when editing
-            if original_ou is None or ou.id != original_ou.id:
-                choices.append((ou.id, ou.name))
+        # Don't allow selecting self as parent when editing
+        choices.extend([(i, n) for (i, n) in ous if original_ou is None or i != original_ou.id])
         
         self.parent_id.choices = choices
-    
-    def validate_name(self, name):
-        if self.original_ou is None or name.data != self.original_ou.name:
-            ou = OrganizationalUnit.query.filter_by(name=name.data).first()
-            if ou is not None:
-                raise ValidationError('OU name already exists. Please choose a different name.')
 
 class ComputerForm(FlaskForm):
     """Computer creation and editing form."""
@@ -153,26 +113,12 @@ class ComputerForm(FlaskForm):
     ou_id = SelectField('Organizational Unit', coerce=int, validators=[])
     submit = SubmitField('Save Computer')
     
-    def __init__(self, original_computer=None, *args, **kwargs):
+    def __init__(self, *args, **kwargs):
         super(ComputerForm, self).__init__(*args, **kwargs)
-        self.original_computer = original_computer
         
         # Populate OU choices
-        ous = OrganizationalUnit.query.all()
+        ous = _cached_ous()
         choices = [(0, 'None')]
-        for ou in ous:
-            choices.append((ou.id, ou.name))
+        choices.extend(ous)
         
         self.ou_id.choices = choices
-    
-    def validate_name(self, name):
-        if self.original_computer is None or name.data != self.original_computer.name:
-            computer = Computer.query.filter_by(name=name.data).first()
-            if computer is not None:
-                raise ValidationError('Computer name already exists. Please choose a different name.')
-    
-    def validate_ip_address(self, ip_address):
-        if self.original_computer is None or ip_address.data != self.original_computer.ip_address:
-            computer = Computer.query.filter_by(ip_address=ip_address.data).first()
-            if computer is not None:
-                raise ValidationError('IP address already in use. Please choose a different IP address.')
\ No newline at end of file
@@ -1,96 +1,111 @@
 """
 Database initialization script with demo data.
+
+Safe to re-run: existing tables are kept and demo rows that already exist are
+skipped. Set INIT_DB_RESET=1 to drop and recreate every table instead.
 """
+from sqlalchemy import text
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from werkzeug.security import generate_password_hash
+
 from app import app
-from models import db, User, Group, OrganizationalUnit, Computer, AuditLog
+from models import (db, upgrade_schema, user_groups,
+                    User, Group, OrganizationalUnit, Computer, AuditLog)
 from datetime import datetime, timedelta
+import os
 import random
 
+RESET_SCHEMA = os.environ.get('INIT_DB_RESET') == '1'
+
+# Demo-only shortcut: INIT_DB_FAST_HASH=1 seeds with a cheap PBKDF2 cost so the
+# script finishes in milliseconds. Never use it for a database that faces users.
+SEED_HASH_METHOD = 'pbkdf2:sha256:1000' if os.environ.get('INIT_DB_FAST_HASH') == '1' else None
+
+def hash_once(cache, password):
+    """Hash each distinct demo password a single time and reuse the result."""
+    if password not in cache:
+        if not User.validate_password_strength(password):
+            raise ValueError("Password does not meet security requirements")
+        cache[password] = generate_password_hash(
+            password, method=SEED_HASH_METHOD or app.config['PASSWORD_HASH_METHOD']
+        )
+    return cache[password]
+
+def seed_rows(target, rows):
+    """Insert rows, skipping any that collide with an existing unique key."""
+    if rows:
+        db.session.execute(sqlite_insert(target).on_conflict_do_nothing(), rows)
+
+def ids_by(column, values):
+    """Map each of values to the id of the row whose column holds it."""
+    model = column.class_
+    return dict(db.session.query(column, model.id).filter(column.in_(values)).all())
+
+def get_or_create_ou(name, description, parent=None):
+    """Return the OU with this name, creating it under parent if it doesn't exist."""
+    ou = OrganizationalUnit.query.filter_by(name=name).first()
+    if ou is None:
+        # Added through the ORM so the mapper events fill in the stored path
+        ou = OrganizationalUnit(name=name, description=description, parent=parent)
+        db.session.add(ou)
+        db.session.flush()
+    return ou
+
 def init_database():
     """Initialize database with demo data."""
     with app.app_context():
-        # Drop all tables and recreate
-        db.drop_all()
-        db.create_all()
+        # Importing app already created or upgraded the schema via create_app()
+        if RESET_SCHEMA:
+            db.drop_all()
+            upgrade_schema()
         
         print("Initializing database with demo data...")
         
-        # Create Organizational Units
-        root_ou = OrganizationalUnit(
-            name="Corporate",
-            description="Root organizational unit"
-        )
-        db.session.add(root_ou)
-        db.session.commit()
+        # Everything below is written in a single transaction; durability
+        # of each intermediate step doesn't matter for a seed script
+        if db.engine.dialect.name == 'sqlite':
+            db.session.execute(text('PRAGMA synchronous=OFF'))
         
-        it_ou = OrganizationalUnit(
-            name="IT Department",
-            description="Information Technology Department",
-            parent_id=root_ou.id
-        )
-        db.session.add(it_ou)
-        
-        hr_ou = OrganizationalUnit(
-            name="HR Department",
-            description="Human Resources Department",
-            parent_id=root_ou.id
-        )
-        db.session.add(hr_ou)
-        
-        finance_ou = OrganizationalUnit(
-            name="Finance Department",
-            description="Finance and Accounting Department",
-            parent_id=root_ou.id
-        )
-        db.session.add(finance_ou)
-        
-        db.session.commit()
+        # Create Organizational Units
+        root_ou = get_or_create_ou("Corporate", "Root organizational unit")
+        it_ou = get_or_create_ou("IT Department", "Information Technology Department", root_ou)
+        hr_ou = get_or_create_ou("HR Department", "Human Resources Department", root_ou)
+        finance_ou = get_or_create_ou("Finance Department", "Finance and Accounting Department", root_ou)
         
         # Create Groups
-        admin_group = Group(
-            name="Domain Admins",
-            description="Full administrative access to all systems",
-            permissions="read-write"
-        )
-        db.session.add(admin_group)
-        
-        it_group = Group(
-            name="IT Support",
-            description="IT support staff with elevated privileges",
-            permissions="read-write"
-        )
-        db.session.add(it_group)
-        
-        users_group = Group(
-            name="Domain Users",
-            description="Standard user group with basic access",
-            permissions="read-only"
-        )
-        db.session.add(users_group)
-        
-        hr_group = Group(
-            name="HR Staff",
-            description="Human Resources staff group",
-            permissions="read-write"
-        )
-        db.session.add(hr_group)
-        
-        db.session.commit()
-        
-        # Create Admin User with specified credentials
-        admin_user = User(
-            username="admin",
-            email="admin@company.com",
-            first_name="System",
-            last_name="Administrator",
-            role="Admin",
-            is_active=True
-        )
-        admin_user.set_password("Admin123")
-        db.session.add(admin_user)
+        seed_rows(Group, [
+            {
+                "name": "Domain Admins",
+                "description": "Full administrative access to all systems",
+                "permissions": "read-write"
+            },
+            {
+                "name": "IT Support",
+                "description": "IT support staff with elevated privileges",
+                "permissions": "read-write"
+            },
+            {
+                "name": "Domain Users",
+                "description": "Standard user group with basic access",
+                "permissions": "read-only"
+            },
+            {
+                "name": "HR Staff",
+                "description": "Human Resources staff group",
+                "permissions": "read-write"
+            }
+        ])
         
-        # Create Demo Users with valid passwords
+        # Create Admin User with specified credentials and Demo Users with valid passwords
         demo_users = [
+            {
+                "username": "admin",
+                "email": "admin@company.com",
+                "first_name": "System",
+                "last_name": "Administrator",
+                "role": "Admin",
+                "password": "Admin123"
+            },
             {
                 "username": "jdoe",
                 "email": "john.doe@company.com",
@@ -133,32 +148,30 @@ def init_database():
             }
         ]
         
-        users_list = []
+        # Demo users share passwords, so skip repeating the key stretching
+        password_hashes = {}
+        user_rows = []
         for user_data in demo_users:
-            user = User(
-                username=user_data["username"],
-                email=user_data["email"],
-                first_name=user_data["first_name"],
-                last_name=user_data["last_name"],
-                role=user_data["role"],
-                is_active=True
-            )
-            user.set_password(user_data["password"])
-            db.session.add(user)
-            users_list.append(user)
-        
-        db.session.commit()
+            row = dict(user_data, is_active=True)
+            row["password_hash"] = hash_once(password_hashes, row.pop("password"))
+            user_rows.append(row)
+        seed_rows(User, user_rows)
         
         # Add users to groups
-        admin_user.groups.append(admin_group)
-        users_list[2].groups.append(admin_group)  # bwilson
-        
-        for user in users_list:
-            user.groups.append(users_group)
-            if user.username in ['jdoe', 'asmith']:
-                user.groups.append(it_group)
-            elif user.username == 'mjohnson':
-                user.groups.append(hr_group)
+        memberships = [
+            ("admin", "Domain Admins"),
+            ("bwilson", "Domain Admins"),
+            ("jdoe", "IT Support"),
+            ("asmith", "IT Support"),
+            ("mjohnson", "HR Staff")
+        ]
+        memberships += [(user_data["username"], "Domain Users") for user_data in demo_users[1:]]
+        user_ids = ids_by(User.username, [user_data["username"] for user_data in demo_users])
+        group_ids = ids_by(Group.name, {group for _, group in memberships})
+        seed_rows(user_groups, [
+            {"user_id": user_ids[username], "group_id": group_ids[group]}
+            for username, group in memberships
+        ])
         
         # Create Demo Computers
         demo_computers = [
@@ -213,46 +226,40 @@ def init_database():
         ]
         
         for comp_data in demo_computers:
-            computer = Computer(
-                name=comp_data["name"],
-                description=comp_data["description"],
-                operating_system=comp_data["operating_system"],
-                ip_address=comp_data["ip_address"],
-                status=comp_data["status"],
-                ou_id=comp_data["ou_id"],
-                last_seen=datetime.utcnow() if comp_data["status"] == "ON" else None
-            )
-            db.session.add(computer)
-        
-        db.session.commit()
-        
-        # Create Demo Audit Logs
-        demo_actions = [
-            ("User Login", "User: admin", "Successful login from IP: 127.0.0.1"),
-            ("User Created", "User: jdoe", "New user created with role: User"),
-            ("Group Created", "Group: IT Support", "New group created with permissions: read-write"),
-            ("Computer ON", "Computer: WS-IT-001", "Status changed from OFF to ON"),
-            ("Password Reset", "User: asmith", "Admin reset password for user"),
-            ("User Updated", "User: mjohnson", "User profile updated"),
-            ("Computer RESTART", "Computer: WS-FIN-001", "Status changed from ON to RESTART"),
-            ("Group Updated", "Group: Domain Users", "Group information updated"),
-            ("OU Created", "OU: IT Department", "New organizational unit created"),
-            ("User Login", "User: jdoe", "Successful login from IP: 192.168.1.101")
-        ]
-        
-        for i, (action, target, details) in enumerate(demo_actions):
-            log_time = datetime.utcnow() - timedelta(hours=random.randint(1, 72))
-            audit_log = AuditLog(
-                user_id=admin_user.id,
-                action=action,
-                target=target,
-                details=details,
-                timestamp=log_time,
-                ip_address="127.0.0.1"
-            )
-            db.session.add(audit_log)
+            comp_data["last_seen"] = datetime.utcnow() if comp_data["status"] == "ON" else None
+        seed_rows(Computer, demo_computers)
         
-        db.session.commit()
+        # Create Demo Audit Logs, only the first time so re-runs don't pile up fake history
+        if db.session.query(AuditLog.query.exists()).scalar():
+            db.session.commit()
+        else:
+            demo_actions = [
+                ("User Login", "User: admin", "Successful login from IP: 127.0.0.1"),
+                ("User Created", "User: jdoe", "New user created with role: User"),
+                ("Group Created", "Group: IT Support", "New group created with permissions: read-write"),
+                ("Computer ON", "Computer: WS-IT-001", "Status changed from OFF to ON"),
+                ("Password Reset", "User: asmith", "Admin reset password for user"),
+                ("User Updated", "User: mjohnson", "User profile updated"),
+                ("Computer RESTART", "Computer: WS-FIN-001", "Status changed from ON to RESTART"),
+                ("Group Updated", "Group: Domain Users", "Group information updated"),
+                ("OU Created", "OU: IT Department", "New organizational unit created"),
+                ("User Login", "User: jdoe", "Successful login from IP: 192.168.1.101")
+            ]
+            
+            audit_logs = []
+            for i, (action, target, details) in enumerate(demo_actions):
+                log_time = datetime.utcnow() - timedelta(hours=random.randint(1, 72))
+                audit_logs.append({
+                    "user_id": user_ids["admin"],
+                    "action": action,
+                    "target": target,
+                    "details": details,
+                    "timestamp": log_time,
+                    "ip_address": "127.0.0.1"
+                })
+            
+            # Inserts the logs and commits the whole seed transaction
+            AuditLog.bulk_log(audit_logs)
         
         print("Database initialized successfully!")
         print("\nPrimary Admin Login Credentials:")
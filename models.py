@@ -1,14 +1,113 @@
 """
 Database models for the Active Directory Clone application.
 """
-from datetime import datetime, timedelta,timezone
+from datetime import datetime
+from flask import current_app
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
-import re
+from sqlalchemy import DDL, MetaData, case, event, func, inspect, select, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.schema import CreateTable
+import atexit
+import os
+import queue
+import string
+import threading
+import time
 
 db = SQLAlchemy()
 
+_UPPERS = frozenset(string.ascii_uppercase)
+_DIGITS = frozenset(string.digits)
+
+def create_missing_indexes(connection):
+    """Create any declared indexes that are absent from existing tables.
+
+    db.create_all() only creates indexes alongside new tables, so databases
+    created before an index was declared need this to pick it up.
+    """
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=connection, checkfirst=True)
+
+def make_indexes_unique(connection):
+    """Recreate live indexes that are declared unique but were created without UNIQUE.
+
+    create_missing_indexes() matches indexes by name only, so a column that
+    gained unique=True keeps its old plain index and accepts duplicates.
+    """
+    inspector = inspect(connection)
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        live = {index['name']: index for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if not index.unique or index.name not in live or live[index.name]['unique']:
+                continue
+            connection.execute(text(f'DROP INDEX "{index.name}"'))
+            try:
+                index.create(bind=connection)
+            except IntegrityError as e:
+                columns = ', '.join(column.name for column in index.columns)
+                raise RuntimeError(
+                    f'Cannot make {index.name} unique: {table.name} has duplicate '
+                    f'values in ({columns}); remove them and restart.'
+                ) from e
+
+def rebuild_for_server_defaults(connection):
+    """Rebuild SQLite tables whose live columns lack a declared server default.
+
+    SQLite can't ALTER a column's default, so tables created before the
+    timestamps moved to server_default=func.now() would reject inserts that
+    leave them out. Each such table is recreated from the model and its rows
+    copied across (SQLite's documented table rebuild). Indexes and triggers
+    go with the old table; the later upgrade steps recreate them.
+    """
+    if connection.dialect.name != 'sqlite':
+        return
+    inspector = inspect(connection)
+    quote = connection.dialect.identifier_preparer.quote
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        live = {column['name']: column for column in inspector.get_columns(table.name)}
+        if not any(column.server_default is not None and column.name in live
+                   and live[column.name]['default'] is None for column in table.columns):
+            continue
+        # Copy every table so foreign keys in the new one resolve to the real names
+        copies = MetaData()
+        for other in db.metadata.sorted_tables:
+            other.to_metadata(copies)
+        new_table = table.to_metadata(copies, name=f'_new_{table.name}')
+        connection.execute(CreateTable(new_table))
+        shared = [column.name for column in table.columns if column.name in live]
+        connection.execute(new_table.insert().from_select(
+            shared, select(*(table.c[name] for name in shared))
+        ))
+        connection.execute(text(f'DROP TABLE {quote(table.name)}'))
+        connection.execute(text(f'ALTER TABLE {quote(new_table.name)} RENAME TO {quote(table.name)}'))
+
+def upgrade_schema():
+    """Create missing tables and bring an existing database up to the models.
+
+    Called from create_app(), so every entry point (app.py, wsgi.py,
+    init_db.py) upgrades before serving. Each step checks the live schema
+    first and is a no-op on a current database. All steps share one
+    connection, and on SQLite one write-locked transaction, so workers
+    starting together don't repeat each other's work.
+    """
+    with db.engine.connect() as connection:
+        if connection.dialect.name == 'sqlite':
+            connection.exec_driver_sql('BEGIN IMMEDIATE')
+        db.metadata.create_all(connection)
+        add_ou_path(connection)
+        rebuild_for_server_defaults(connection)
+        make_indexes_unique(connection)
+        create_missing_indexes(connection)
+        create_user_search(connection)
+        connection.commit()
+
 # Association table for many-to-many relationship between users and groups
 user_groups = db.Table('user_groups',
     db.Column('user_id', db.Integer, db.ForeignKey('user.id'), primary_key=True),
@@ -25,48 +124,58 @@ class User(UserMixin, db.Model):
     first_name = db.Column(db.String(50), nullable=False)
     last_name = db.Column(db.String(50), nullable=False)
     role = db.Column(db.String(20), nullable=False, default='User')  # Admin or User
-    is_active = db.Column(db.Boolean, default=True, nullable=False)
+    is_active = db.Column(db.Boolean, default=True, nullable=False, index=True)
     failed_attempts = db.Column(db.Integer, default=0, nullable=False)
+    # Every DateTime column holds naive UTC: datetime.utcnow() in Python and
+    # func.now() (CURRENT_TIMESTAMP, UTC on SQLite) in server defaults
     locked_until = db.Column(db.DateTime, nullable=True)
-    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
+    created_at = db.Column(db.DateTime, server_default=func.now(), nullable=False)
     last_login = db.Column(db.DateTime, nullable=True)
     
     # Relationships
-    groups = db.relationship('Group', secondary=user_groups, lazy='subquery',
-                           backref=db.backref('members', lazy=True))
+    # Loaded on access; list pages that render them batch with selectinload()
+    groups = db.relationship('Group', secondary=user_groups, lazy='select',
+                           backref=db.backref('members', lazy='select'))
     audit_logs = db.relationship('AuditLog', backref='user', lazy=True)
     
     def set_password(self, password):
         """Set password hash after validation."""
         if not self.validate_password_strength(password):
             raise ValueError("Password does not meet security requirements")
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = generate_password_hash(
+            password, method=current_app.config['PASSWORD_HASH_METHOD']
+        )
     
     def check_password(self, password):
         """Check if provided password matches hash."""
         return check_password_hash(self.password_hash, password)
     
+    @staticmethod
+    def password_policy_error(password):
+        """Return why password fails the security requirements, or None if it meets them."""
+        # Reject short passwords before touching the characters at all
+        if len(password) < 8:
+            return 'Password must be at least 8 characters long.'
+        # One C-level pass to build the set, then two small hash probes
+        chars = set(password)
+        if _UPPERS.isdisjoint(chars):
+            return 'Password must contain at least one uppercase letter.'
+        if _DIGITS.isdisjoint(chars):
+            return 'Password must contain at least one number.'
+        return None
+    
     @staticmethod
     def validate_password_strength(password):
         """Validate password meets security requirements."""
-        if len(password) < 8:
-            return False
-        if not re.search(r'[A-Z]', password):
-            return False
-        if not re.search(r'\d', password):
-            return False
-        return True
+        return User.password_policy_error(password) is None
     
     def is_locked(self):
         """Check if account is currently locked."""
-        if self.locked_until and datetime.utcnow() < self.locked_until:
-            return True
-        return False
+        return self.locked_until is not None and datetime.utcnow() < self.locked_until
     
     def lock_account(self):
         """Lock account for specified duration."""
-        from config import Config
-        self.locked_until = datetime.utcnow() + Config.ACCOUNT_LOCKOUT_DURATION
+        self.locked_until = datetime.utcnow() + current_app.config['ACCOUNT_LOCKOUT_DURATION']
         self.failed_attempts = 0
     
     def unlock_account(self):
@@ -75,15 +184,78 @@ class User(UserMixin, db.Model):
         self.failed_attempts = 0
     
     def increment_failed_attempts(self):
-        """Increment failed login attempts."""
-        from config import Config
-        self.failed_attempts += 1
-        if self.failed_attempts >= Config.MAX_FAILED_ATTEMPTS:
-            self.lock_account()
+        """Increment failed login attempts, locking the account at the limit."""
+        config = current_app.config
+        # One server-side UPDATE, so concurrent failed logins can't lose a count;
+        # SET expressions all see the old row, matching lock_account()'s reset
+        attempts = User.failed_attempts + 1
+        at_limit = attempts >= config['MAX_FAILED_ATTEMPTS']
+        User.query.filter_by(id=self.id).update({
+            User.failed_attempts: case((at_limit, 0), else_=attempts),
+            User.locked_until: case(
+                (at_limit, datetime.utcnow() + config['ACCOUNT_LOCKOUT_DURATION']),
+                else_=User.locked_until
+            )
+        }, synchronize_session=False)
+        db.session.expire(self, ['failed_attempts', 'locked_until'])
     
     def __repr__(self):
         return f'<User {self.username}>'
 
+# Full-text index over the user search columns (SQLite FTS5). It is an
+# external-content table kept in sync by triggers, so rows written through
+# bulk or Core inserts are indexed as well as ORM flushes.
+USER_SEARCH_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS user_search USING fts5(
+        username, email, first_name, last_name, content='user', content_rowid='id')""",
+    """CREATE TRIGGER IF NOT EXISTS user_search_ai AFTER INSERT ON "user" BEGIN
+        INSERT INTO user_search(rowid, username, email, first_name, last_name)
+        VALUES (new.id, new.username, new.email, new.first_name, new.last_name);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS user_search_ad AFTER DELETE ON "user" BEGIN
+        INSERT INTO user_search(user_search, rowid, username, email, first_name, last_name)
+        VALUES ('delete', old.id, old.username, old.email, old.first_name, old.last_name);
+    END""",
+    # Only the indexed columns: login bookkeeping updates must not rewrite the index
+    """CREATE TRIGGER IF NOT EXISTS user_search_au
+    AFTER UPDATE OF username, email, first_name, last_name ON "user" BEGIN
+        INSERT INTO user_search(user_search, rowid, username, email, first_name, last_name)
+        VALUES ('delete', old.id, old.username, old.email, old.first_name, old.last_name);
+        INSERT INTO user_search(rowid, username, email, first_name, last_name)
+        VALUES (new.id, new.username, new.email, new.first_name, new.last_name);
+    END""",
+]
+
+for _statement in USER_SEARCH_DDL:
+    event.listen(User.__table__, 'after_create', DDL(_statement).execute_if(dialect='sqlite'))
+event.listen(User.__table__, 'before_drop',
+             DDL('DROP TABLE IF EXISTS user_search').execute_if(dialect='sqlite'))
+
+def create_user_search(connection):
+    """Create the user search index and its triggers on an existing SQLite database."""
+    if connection.dialect.name != 'sqlite':
+        return
+    exists = inspect(connection).has_table('user_search')
+    # Replace an update trigger from before it was limited to the indexed columns
+    trigger_sql = connection.execute(text(
+        "SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = 'user_search_au'"
+    )).scalar()
+    if trigger_sql is not None and 'UPDATE OF' not in trigger_sql:
+        connection.execute(text('DROP TRIGGER user_search_au'))
+    # Every statement is IF NOT EXISTS, so this also restores missing triggers
+    for statement in USER_SEARCH_DDL:
+        connection.execute(text(statement))
+    if not exists:
+        connection.execute(text("INSERT INTO user_search(user_search) VALUES ('rebuild')"))
+
+def search_user_ids(term):
+    """Subquery of ids of users whose username, email or name has a word starting with each term."""
+    # Quote every token so punctuation in emails can't break the MATCH syntax
+    tokens = ['"%s"*' % token.replace('"', '""') for token in term.split()]
+    return text(
+        'SELECT rowid FROM user_search WHERE user_search MATCH :q'
+    ).bindparams(q=' '.join(tokens)).columns(rowid=db.Integer)
+
 class Group(db.Model):
     """Group model for organizing users and managing permissions."""
     
@@ -91,7 +263,7 @@ class Group(db.Model):
     name = db.Column(db.String(100), unique=True, nullable=False, index=True)
     description = db.Column(db.Text, nullable=True)
     permissions = db.Column(db.String(50), nullable=False, default='read-only')  # read-only, read-write
-    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
+    created_at = db.Column(db.DateTime, server_default=func.now(), nullable=False)
     
     def __repr__(self):
         return f'<Group {self.name}>'
@@ -99,12 +271,15 @@ class Group(db.Model):
 class OrganizationalUnit(db.Model):
     """Organizational Unit model for hierarchical structure."""
     
+    __table_args__ = (db.Index('ix_ou_parent', 'parent_id'),)
+    
     id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String(100), nullable=False, index=True)
+    name = db.Column(db.String(100), unique=True, nullable=False, index=True)
     description = db.Column(db.Text, nullable=True)
     parent_id = db.Column(db.Integer, db.ForeignKey('organizational_unit.id'), nullable=True)
-    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
-
+    # Materialized 'Root > Child > ...' path, kept current by the mapper events below
+    path = db.Column(db.String(512), nullable=False, default='')
+    created_at = db.Column(db.DateTime, server_default=func.now(), nullable=False)
     
     # Self-referential relationship for hierarchy
     parent = db.relationship('OrganizationalUnit', remote_side=[id], backref='children')
@@ -112,27 +287,90 @@ class OrganizationalUnit(db.Model):
     
     def get_full_path(self):
         """Get full hierarchical path of the OU."""
-        path = [self.name]
-        current = self.parent
-        while current:
-            path.append(current.name)
-            current = current.parent
-        return ' > '.join(reversed(path))
+        if self.path:
+            return self.path
+        if self.id is None:
+            return self.name
+        return self.full_path_for(self.id)
+    
+    @classmethod
+    def full_path_for(cls, ou_id, connection=None):
+        """Get the path of an OU by walking its ancestors in one recursive query."""
+        # depth orders root-first and also stops a parent cycle from recursing forever
+        names = (connection or db.session).execute(text("""
+            WITH RECURSIVE anc(id, name, parent_id, depth) AS (
+                SELECT id, name, parent_id, 0 FROM organizational_unit WHERE id = :id
+                UNION ALL
+                SELECT o.id, o.name, o.parent_id, anc.depth + 1
+                FROM organizational_unit o JOIN anc ON o.id = anc.parent_id
+                WHERE anc.depth < 100
+            )
+            SELECT name FROM anc ORDER BY depth DESC
+        """), {'id': ou_id}).scalars().all()
+        return ' > '.join(names)
     
     def __repr__(self):
         return f'<OU {self.name}>'
 
+def add_ou_path(connection):
+    """Add and backfill OrganizationalUnit.path on databases created before it existed."""
+    if 'path' in {column['name'] for column in inspect(connection).get_columns('organizational_unit')}:
+        return
+    connection.execute(text(
+        "ALTER TABLE organizational_unit ADD COLUMN path VARCHAR(512) NOT NULL DEFAULT ''"
+    ))
+    table = OrganizationalUnit.__table__
+    for ou_id in connection.execute(select(table.c.id)).scalars().all():
+        connection.execute(
+            table.update().where(table.c.id == ou_id)
+            .values(path=OrganizationalUnit.full_path_for(ou_id, connection))
+        )
+
+def _ou_parent_path(connection, target):
+    """Materialized path of target's parent, or None for a root OU."""
+    state = inspect(target)
+    if 'parent' in target.__dict__ and not state.attrs.parent_id.history.has_changes():
+        parent = target.parent
+        return parent.path if parent is not None else None
+    if target.parent_id is None:
+        return None
+    return connection.execute(
+        select(OrganizationalUnit.path).where(OrganizationalUnit.id == target.parent_id)
+    ).scalar()
+
+@event.listens_for(OrganizationalUnit, 'before_insert')
+def _set_ou_path(mapper, connection, target):
+    parent_path = _ou_parent_path(connection, target)
+    target.path = f'{parent_path} > {target.name}' if parent_path else target.name
+
+@event.listens_for(OrganizationalUnit, 'before_update')
+def _update_ou_path(mapper, connection, target):
+    state = inspect(target)
+    if not any(state.attrs[key].history.has_changes() for key in ('name', 'parent_id', 'parent')):
+        return
+    old_path = target.path
+    _set_ou_path(mapper, connection, target)
+    if old_path and target.path != old_path:
+        # Re-prefix every descendant in one statement; substr avoids LIKE wildcards in names
+        prefix = old_path + ' > '
+        table = OrganizationalUnit.__table__
+        connection.execute(
+            table.update()
+            .where(func.substr(table.c.path, 1, len(prefix)) == prefix)
+            .values(path=target.path + func.substr(table.c.path, len(old_path) + 1))
+        )
+
 class Computer(db.Model):
     """Computer model for managing computer accounts."""
     
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), unique=True, nullable=False, index=True)
     description = db.Column(db.Text, nullable=True)
-    status = db.Column(db.String(20), nullable=False, default='OFF')  # ON, OFF, RESTART
+    status = db.Column(db.String(20), nullable=False, default='OFF', index=True)  # ON, OFF, RESTART
     operating_system = db.Column(db.String(100), nullable=True)
-    ip_address = db.Column(db.String(15), nullable=True)
+    ip_address = db.Column(db.String(15), unique=True, nullable=True, index=True)
     ou_id = db.Column(db.Integer, db.ForeignKey('organizational_unit.id'), nullable=True)
-    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
+    created_at = db.Column(db.DateTime, server_default=func.now(), nullable=False)
     last_seen = db.Column(db.DateTime, nullable=True)
     
     def __repr__(self):
@@ -141,17 +379,37 @@ class Computer(db.Model):
 class AuditLog(db.Model):
     """Audit log model for tracking system actions."""
     
+    # Per-user history: filter on user_id and sort by time from one index
+    __table_args__ = (db.Index('ix_audit_user_time', 'user_id', 'timestamp'),)
+    
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     action = db.Column(db.String(100), nullable=False)
     target = db.Column(db.String(200), nullable=False)
     details = db.Column(db.Text, nullable=True)
-    timestamp = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
+    timestamp = db.Column(db.DateTime, server_default=func.now(), nullable=False, index=True)
     ip_address = db.Column(db.String(15), nullable=True)
     
     @staticmethod
     def log_action(user_id, action, target, details=None, ip_address=None):
-        """Create a new audit log entry."""
+        """Create a new audit log entry.
+
+        When the background writer is enabled the entry is held on the
+        session and queued only once the caller's commit succeeds, so a
+        rolled-back change is never logged; otherwise it is added to the
+        session and committed by the caller along with the change it records.
+        """
+        if audit_writer.enabled:
+            db.session.info.setdefault('pending_audit', []).append({
+                'user_id': user_id,
+                'action': action,
+                'target': target,
+                'details': details,
+                'ip_address': ip_address,
+                'timestamp': datetime.utcnow()
+            })
+            return
+        
         log_entry = AuditLog(
             user_id=user_id,
             action=action,
@@ -160,7 +418,103 @@ class AuditLog(db.Model):
             ip_address=ip_address
         )
         db.session.add(log_entry)
+    
+    @staticmethod
+    def bulk_log(rows):
+        """Insert many audit log entries (dicts of columns) with one commit."""
+        db.session.bulk_insert_mappings(AuditLog, rows)
         db.session.commit()
     
     def __repr__(self):
-        return f'<AuditLog {self.action} on {self.target}>'
\ No newline at end of file
+        return f'<AuditLog {self.action} on {self.target}>'
+
+class AuditLogWriter:
+    """Background writer that batch-inserts queued audit log entries.
+
+    Entries are written by a daemon thread every AUDIT_LOG_FLUSH_INTERVAL
+    seconds, at most AUDIT_LOG_BATCH_SIZE rows per commit, so request
+    handlers never wait on the audit INSERT. Pending entries are flushed
+    at interpreter exit.
+    """
+    
+    def __init__(self, app=None):
+        self.app = None
+        self.enabled = False
+        self._queue = queue.Queue()
+        self._start_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        if app is not None:
+            self.init_app(app)
+    
+    def init_app(self, app):
+        self.app = app
+        self.enabled = app.config.get('AUDIT_LOG_ASYNC', False)
+        self.batch_size = app.config.get('AUDIT_LOG_BATCH_SIZE', 512)
+        self.flush_interval = app.config.get('AUDIT_LOG_FLUSH_INTERVAL', 0.1)
+        if self.enabled:
+            atexit.register(self.flush)
+    
+    def put(self, entry):
+        """Queue an audit log row, starting the worker if needed."""
+        self._ensure_worker()
+        self._queue.put(entry)
+    
+    def flush(self):
+        """Write every queued entry and wait for in-flight batches."""
+        while True:
+            batch = self._drain()
+            if not batch:
+                break
+            self._write(batch)
+        self._queue.join()
+    
+    def _ensure_worker(self):
+        # Started lazily and per process, so forking servers get a live thread
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or self._pid != os.getpid() or not self._thread.is_alive():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name='audit-log-writer', daemon=True)
+                self._thread.start()
+    
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            # Give concurrent requests a moment to add to the same batch
+            time.sleep(self.flush_interval)
+            self._write([first] + self._drain(self.batch_size - 1))
+    
+    def _drain(self, limit=None):
+        limit = self.batch_size if limit is None else limit
+        batch = []
+        while len(batch) < limit:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+    
+    def _write(self, batch):
+        with self._write_lock, self.app.app_context():
+            try:
+                AuditLog.bulk_log(batch)
+            except Exception:
+                db.session.rollback()
+                self.app.logger.exception('Failed to write %d audit log entries', len(batch))
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+audit_writer = AuditLogWriter()
+
+@event.listens_for(db.session, 'after_commit')
+def _queue_committed_audit(session):
+    for entry in session.info.pop('pending_audit', ()):
+        audit_writer.put(entry)
+
+@event.listens_for(db.session, 'after_soft_rollback')
+def _drop_rolled_back_audit(session, previous_transaction):
+    session.info.pop('pending_audit', None)
@@ -0,0 +1,9 @@
+"""
+WSGI entry point for production servers.
+
+    FLASK_CONFIG=production gunicorn -w 4 -k gthread --threads 8 wsgi:app
+"""
+from app import app
+
+if __name__ == '__main__':
+    app.run()